@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import os
 from pathlib import Path
 from subprocess import Popen
@@ -5,6 +7,7 @@ import importlib
 import typer
 from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 import sys
+from typing import List
 from typing_extensions import Annotated
 from q8s.execution import K8sContext
 from q8s.enums import Target
@@ -25,6 +28,9 @@ def build(
         bool, typer.Option(help="Dry run does not push images to the registry")
     ] = False,
     silent: Annotated[bool, typer.Option(help="Silent mode")] = True,
+    force: Annotated[
+        bool, typer.Option(help="Rebuild images even if their inputs are unchanged")
+    ] = False,
 ):
 
     with Progress(
@@ -58,36 +64,29 @@ def build(
                 progress=progress,
                 push=(not dry_run),
                 silent=silent,
+                force=force,
             )
 
         else:
-            for build in project.configuration.targets.keys():
-                project.build_container(
-                    build, progress=progress, push=(not dry_run), silent=silent
-                )
+            project.build_all(
+                project.configuration.targets.keys(),
+                progress=progress,
+                push=(not dry_run),
+                silent=silent,
+                force=force,
+            )
 
     print(f"Project {project.name} ready")
     project.update_images_cache()
 
 
-@app.command()
-def execute(
-    file: Annotated[Path, typer.Argument(help="Python file to be executed")],
-    target: Annotated[
-        Target, typer.Option(help="Execution target", case_sensitive=False)
-    ] = Target.gpu,
-    kubeconfig: Annotated[
-        Path, typer.Option(help="Kubernetes configuration", envvar="KUBECONFIG")
-    ] = None,
-    image: Annotated[str, typer.Option(help="Docker image")] = None,
-    registry_pat: Annotated[
-        str,
-        typer.Option(
-            help="Registry personal access token (PAT)",
-            envvar="REGISTRY_PAT",
-        ),
-    ] = None,
+@contextmanager
+def k8s_session(
+    target: Target, kubeconfig: Path | None, image: str | None, registry_pat: str
 ):
+    """
+    Load the project and the cluster configuration for executing jobs on the target.
+    """
     project = Project()
 
     if image is None:
@@ -100,12 +99,6 @@ def execute(
         typer.echo(f"kubeconfig file {kubeconfig} does not exist")
         raise typer.Exit(code=1)
 
-    # kubeconfig = os.environ.get("KUBECONFIG", kubeconfig.as_posix())
-
-    if kubeconfig is None:
-        typer.echo("KUBECONFIG not set")
-        raise typer.Exit(code=1)
-
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -117,13 +110,87 @@ def execute(
         k8s_context.set_container_image(image)
         k8s_context.set_registry_pat(registry_pat)
 
-        with open(file, "r") as f:
-            code = f.read()
-            # output, stream_name = execute_k8s(code, None, image, registry_pat)
-            output, stream_name = k8s_context.execute(code)
+        yield k8s_context
+
+
+@app.command()
+def execute(
+    file: Annotated[Path, typer.Argument(help="Python file to be executed")],
+    target: Annotated[
+        Target, typer.Option(help="Execution target", case_sensitive=False)
+    ] = Target.gpu,
+    kubeconfig: Annotated[
+        Path, typer.Option(help="Kubernetes configuration", envvar="KUBECONFIG")
+    ] = None,
+    image: Annotated[str, typer.Option(help="Docker image")] = None,
+    registry_pat: Annotated[
+        str,
+        typer.Option(
+            help="Registry personal access token (PAT)",
+            envvar="REGISTRY_PAT",
+        ),
+    ] = None,
+):
+    with k8s_session(target, kubeconfig, image, registry_pat) as k8s_context:
+        code = file.read_text(encoding="utf-8")
+        # output, stream_name = execute_k8s(code, None, image, registry_pat)
+        output, stream_name = k8s_context.execute(code)
+
+        print(f"output:\n{output}")
+        print(f"output stream: {stream_name}")
+
+
+@app.command()
+def execute_batch(
+    files: Annotated[List[Path], typer.Argument(help="Python files to be executed")],
+    target: Annotated[
+        Target, typer.Option(help="Execution target", case_sensitive=False)
+    ] = Target.gpu,
+    kubeconfig: Annotated[
+        Path, typer.Option(help="Kubernetes configuration", envvar="KUBECONFIG")
+    ] = None,
+    image: Annotated[str, typer.Option(help="Docker image")] = None,
+    registry_pat: Annotated[
+        str,
+        typer.Option(
+            help="Registry personal access token (PAT)",
+            envvar="REGISTRY_PAT",
+        ),
+    ] = None,
+    cluster: Annotated[
+        bool, typer.Option(help="Run all files sequentially in a single pod")
+    ] = False,
+    parallel: Annotated[
+        int, typer.Option(help="Maximum number of jobs running at once", min=1)
+    ] = 4,
+):
+    if cluster and len({file.name for file in files}) != len(files):
+        typer.echo("Clustered files must have unique names")
+        raise typer.Exit(code=1)
+
+    # A single session loads the cluster configuration once for all files
+    with k8s_session(target, kubeconfig, image, registry_pat) as k8s_context:
+        if cluster:
+            scripts = {file.name: file.read_text(encoding="utf-8") for file in files}
+
+            output, stream_name = k8s_context.execute_many(scripts)
 
             print(f"output:\n{output}")
             print(f"output stream: {stream_name}")
+        else:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                results = [
+                    executor.submit(
+                        k8s_context.fork().execute, file.read_text(encoding="utf-8")
+                    )
+                    for file in files
+                ]
+
+            for file, result in zip(files, results):
+                output, stream_name = result.result()
+
+                print(f"{file} output:\n{output}")
+                print(f"{file} output stream: {stream_name}")
 
 
 @app.command()
@@ -167,7 +234,7 @@ def jupyter(
 
         jupyter_process = Popen(
             [sys.executable, "-m", "jupyter", "lab", "-y"],
-            env=environment_variables,
+            env={**os.environ, **environment_variables},
         )
 
         jupyter_process.wait()
@@ -1,47 +1,65 @@
 import ast
+from functools import lru_cache
+import re
 import sys
 
-from stdlib_list import stdlib_list
+# Modules shipped with the interpreter, never listed as requirements
+EXCLUDED_MODULES = frozenset(sys.stdlib_module_names) | frozenset(
+    sys.builtin_module_names
+)
+
+# Statement lists of compound statements, the only places imports can appear
+BLOCK_FIELDS = ("body", "orelse", "handlers", "finalbody", "cases")
+
+# Every import statement contains the import keyword, code without it needs no parsing.
+# Such code is not checked for syntax errors either, it simply has no imports.
+IMPORT_KEYWORD = re.compile(r"\bimport\b")
 
 
 class CodeAnalyzer(ast.NodeVisitor):
-    stdlibs = []
+    stdlibs = EXCLUDED_MODULES
     version = "{}.{}".format(sys.version_info.major, sys.version_info.minor)
 
     def __init__(self, code):
         self.imports = set()
-        self.stdlibs = self.stdlib_list()
 
         # with open(file, "r") as source:
         #     tree = ast.parse(source.read())
 
         #     self.visit(tree)
+        if IMPORT_KEYWORD.search(code) is None:
+            return
+
         tree = ast.parse(code)
-        self.visit(tree)
+        self.visit_statements(tree.body)
 
         # print("working with version: ", self.version)
 
-    def stdlib_list(self):
-        if sys.version_info.major == 3 and sys.version_info.minor < 10:
-            return stdlib_list(self.version)
-        else:
-            return sys.stdlib_module_names
+    def visit_statements(self, nodes):
+        """
+        Visit import statements without descending into expressions.
+        """
+        for node in nodes:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                self.visit(node)
+            else:
+                for field in BLOCK_FIELDS:
+                    self.visit_statements(getattr(node, field, ()))
 
     def addImport(self, name):
+        # Filter on the top-level package so submodules like os.path are excluded too
+        name = name.partition(".")[0]
+
         if name in self.stdlibs:
             pass
-        elif name in sys.builtin_module_names:
-            pass
         else:
-            self.imports.add(name.split(".")[0])
+            self.imports.add(name)
 
     def visit_Import(self, node):
         for alias in node.names:
             # pprint(vars(alias))
             self.addImport(alias.name)
 
-        self.generic_visit(node)
-
     def visit_ImportFrom(self, node):
         # pprint(vars(node))
         # pprint(self.file)
@@ -55,7 +73,13 @@ class CodeAnalyzer(ast.NodeVisitor):
             else:
                 self.addImport(node.module)
 
-        self.generic_visit(node)
-
     def getImports(self):
         return sorted(self.imports)
+
+
+@lru_cache(maxsize=256)
+def analyze(code: str) -> tuple[str, ...]:
+    """
+    Return the sorted imports of the code, memoized on the source text.
+    """
+    return tuple(CodeAnalyzer(code).getImports())
@@ -1,18 +1,35 @@
+from functools import lru_cache
 from importlib.metadata import (
     packages_distributions,
     version,
 )
 
-from .code_analyzer import CodeAnalyzer
+from .code_analyzer import analyze
 
 mapping = {
     "qiskit-aer": "qiskit-aer-gpu",
 }
 
 
+@lru_cache(maxsize=None)
+def installed_distributions():
+    """
+    Map of top-level packages to distributions, scanned once per process.
+    """
+    return packages_distributions()
+
+
+@lru_cache(maxsize=None)
+def installed_version(distribution: str) -> str:
+    """
+    Version of an installed distribution, read once per process.
+    """
+    return version(distribution)
+
+
 class Parser:
     def __init__(self) -> None:
-        self.installed = packages_distributions()
+        self.installed = installed_distributions()
 
     def mapToPip(self, package: str) -> str:
         """
@@ -28,7 +45,7 @@ class Parser:
         """
         Parse the code and returns the requirements.
         """
-        imports = CodeAnalyzer(code).getImports()
+        imports = analyze(code)
 
         pips = list(map(self.mapToPip, imports))
 
@@ -37,7 +54,7 @@ class Parser:
                 map(
                     lambda x: "{name}=={version}".format(
                         name=mapping[x] if x in mapping.keys() else x,
-                        version=version(x),
+                        version=installed_version(x),
                     ),
                     pips,
                 )
@@ -1,10 +1,12 @@
 import base64
+from copy import copy
 from json import JSONEncoder, loads
 import logging
 import os
 import random
 import string
 from time import sleep
+from typing import Dict
 from dotenv import dotenv_values
 from kubernetes import client, config, watch
 import pluggy
@@ -17,6 +19,8 @@ from q8s.plugins.cpu_job import CPUJobTemplatePlugin
 from q8s.plugins.cuda_job import CUDAJobTemplatePlugin
 from q8s.utils import extract_non_none_value
 
+API_POOL_THREADS = 4
+
 
 def load_env():
     env = dotenv_values(".env.q8s")
@@ -24,12 +28,24 @@ def load_env():
     return env
 
 
+def load_job_plugins() -> pluggy.PluginManager:
+    """
+    Create the plugin manager with the built-in job template plugins.
+    """
+    jm = pluggy.PluginManager("q8s")
+    jm.add_hookspecs(JobTemplatePluginSpec)
+    jm.register(CPUJobTemplatePlugin())
+    jm.register(CUDAJobTemplatePlugin())
+
+    return jm
+
+
 class K8sContext:
     container_image: str | None = None
     registry_pat: str | None = None
     jupyter_logger: None
     target: Target = Target.gpu
-    jm: pluggy.PluginManager = pluggy.PluginManager("q8s")
+    jm: pluggy.PluginManager = load_job_plugins()
     __progress: Progress | None
 
     def __init__(self, kubeconfig: str, logger=None, progress: Progress = None):
@@ -38,10 +54,6 @@ class K8sContext:
         """
         self.__progress = progress
 
-        self.jm.add_hookspecs(JobTemplatePluginSpec)
-        self.jm.register(CPUJobTemplatePlugin())
-        self.jm.register(CUDAJobTemplatePlugin())
-
         task_config = self.__progress.add_task(
             "[cyan]Loading configuration...", total=1
         )
@@ -57,8 +69,10 @@ class K8sContext:
             self.namespace = "default"
         self.__progress.console.print(f"Active namespace: {self.namespace}")
 
-        self.core_api_instance = client.CoreV1Api()
-        self.batch_api_instance = client.BatchV1Api()
+        # Requests issued with async_req=True run concurrently on this pool
+        api_client = client.ApiClient(pool_threads=API_POOL_THREADS)
+        self.core_api_instance = client.CoreV1Api(api_client)
+        self.batch_api_instance = client.BatchV1Api(api_client)
 
         self.name = f"qubernetes-job-{K8sContext.get_id()}"
 
@@ -82,15 +96,22 @@ class K8sContext:
     def set_target(self, target: Target):
         self.target = target
 
+    def fork(self) -> "K8sContext":
+        """
+        Copy the context to run a job alongside the others, sharing the cluster
+        configuration and API clients.
+        """
+        return copy(self)
+
     def create_job_object(self, code: str) -> client.V1Job:
         return None
 
     def __registry_credentials_secret_name(self):
         return f"{self.name}-regcred"
 
-    def __create_job_object(self, code: str):
+    def __create_job_object(self, scripts: Dict[str, str]):
         """
-        Create a job object with the given code.
+        Create a job object running the given scripts in order.
         """
         prepare_task = self.__progress.add_task("[cyan]Prepare job...", total=1)
         env = self.__prepare_environment()
@@ -103,7 +124,7 @@ class K8sContext:
 
         template = extract_non_none_value(
             self.jm.hook.makejob(
-                code=code,
+                entry_scripts=list(scripts),
                 env=env,
                 container_image=self.container_image,
                 target=self.target,
@@ -133,26 +154,46 @@ class K8sContext:
         )
         self.__progress.console.print("Job created")
 
-        self.__create_config_map_object(code, job)
-        self.__progress.console.print("Application code created")
-        self.__create_environment_secret()
-        self.__progress.console.print("Environment variables created")
+        # The remaining resources are independent, submit them all before waiting
+        requests = [
+            (self.__create_config_map_object(scripts, job), "Application code created"),
+            (self.__create_environment_secret(), "Environment variables created"),
+        ]
 
         if self.registry_pat:
-            self.__create_registry_credentials_secret()
+            requests.append(
+                (
+                    self.__create_registry_credentials_secret(),
+                    "Registry credentials created",
+                )
+            )
+
+        # Wait for every request, so none is still in flight when the job is cleaned up
+        errors = []
+
+        for request, message in requests:
+            try:
+                request.get()
+            except Exception as e:
+                errors.append(e)
+            else:
+                self.__progress.console.print(message)
+
+        if errors:
+            raise errors[0]
 
         self.__progress.advance(prepare_task, 1)
         return job
 
-    def __create_config_map_object(self, code: str, job: client.V1Job):
+    def __create_config_map_object(self, scripts: Dict[str, str], job: client.V1Job):
         """
-        Create a ConfigMap object with the given code.
+        Create a ConfigMap object with the given scripts.
         """
         # Configureate ConfigMap from a local file
         configmap = client.V1ConfigMap(
             api_version="v1",
             kind="ConfigMap",
-            data={"main.py": code},
+            data=scripts,
             metadata=client.V1ObjectMeta(
                 name=self.name,
                 owner_references=[
@@ -168,8 +209,8 @@ class K8sContext:
             ),
         )
 
-        self.core_api_instance.create_namespaced_config_map(
-            namespace=self.namespace, body=configmap
+        return self.core_api_instance.create_namespaced_config_map(
+            namespace=self.namespace, body=configmap, async_req=True
         )
 
     def __create_environment_secret(self):
@@ -203,8 +244,8 @@ class K8sContext:
             ),
         )
 
-        self.core_api_instance.create_namespaced_secret(
-            namespace=self.namespace, body=secret
+        return self.core_api_instance.create_namespaced_secret(
+            namespace=self.namespace, body=secret, async_req=True
         )
 
     def __create_registry_credentials_secret(self):
@@ -242,8 +283,8 @@ class K8sContext:
             },
         )
 
-        self.core_api_instance.create_namespaced_secret(
-            namespace=self.namespace, body=secret
+        return self.core_api_instance.create_namespaced_secret(
+            namespace=self.namespace, body=secret, async_req=True
         )
 
     def __delete_job(self):
@@ -390,9 +431,17 @@ class K8sContext:
         """
         Execute the given code.
         """
+        return self.execute_many({"main.py": code})
+
+    def execute_many(self, scripts: Dict[str, str]) -> tuple[str, str]:
+        """
+        Execute the given scripts sequentially in a single pod.
+        """
+        # Each run gets its own resources, the previous job may still be terminating
+        self.name = f"qubernetes-job-{K8sContext.get_id()}"
 
         try:
-            self.__create_job_object(code=code)
+            self.__create_job_object(scripts=scripts)
 
             if self.jupyter_logger is not None:
                 self.jupyter_logger(f"Job {self.name} created")
@@ -1,8 +1,8 @@
-from q8s.plugins.job_template_spec import hookimpl
+from q8s.plugins.job_template_spec import entry_command, hookimpl
 from q8s.enums import Target
 from kubernetes import client
 from q8s.constants import WORKSPACE
-from typing import Dict
+from typing import Dict, List
 
 
 class CPUJobTemplatePlugin:
@@ -19,17 +19,20 @@ class CPUJobTemplatePlugin:
             str | None,
         ],
         target: Target,
+        entry_scripts: List[str],
     ) -> client.V1PodTemplateSpec:
 
         if target != Target.cpu:
             return None
 
+        command, args = entry_command(entry_scripts)
+
         container = client.V1Container(
             name="quantum-routine",
             image=container_image,
             env=env,
-            command=["python"],
-            args=[f"{WORKSPACE}/main.py"],
+            command=command,
+            args=args,
             image_pull_policy="Always",
             volume_mounts=[
                 client.V1VolumeMount(
@@ -1,9 +1,9 @@
 import os
-from typing import Dict
+from typing import Dict, List
 from kubernetes import client
 from q8s.constants import WORKSPACE
 from q8s.enums import Target
-from q8s.plugins.job_template_spec import hookimpl
+from q8s.plugins.job_template_spec import entry_command, hookimpl
 
 MEMORY = os.environ.get("MEMORY", "32Gi")
 
@@ -25,17 +25,20 @@ class CUDAJobTemplatePlugin:
             str | None,
         ],
         target: Target,
+        entry_scripts: List[str],
     ) -> client.V1PodTemplateSpec:
 
         if target != Target.gpu:
             return None
 
+        command, args = entry_command(entry_scripts)
+
         container = client.V1Container(
             name="quantum-routine",
             image=container_image,
             env=env,
-            command=["python"],
-            args=[f"{WORKSPACE}/main.py"],
+            command=command,
+            args=args,
             image_pull_policy="Always",
             resources=(
                 client.V1ResourceRequirements(
@@ -1,5 +1,6 @@
 import os
-from typing import Dict
+import shlex
+from typing import Dict, List
 import pluggy
 from kubernetes import client
 
@@ -10,6 +11,20 @@ hookspec = pluggy.HookspecMarker("q8s")
 hookimpl = pluggy.HookimplMarker("q8s")
 
 
+def entry_command(entry_scripts: List[str]) -> tuple[List[str], List[str]]:
+    """
+    Container command and arguments running the entry scripts in order.
+    """
+    if len(entry_scripts) == 1:
+        return ["python"], [f"{WORKSPACE}/{entry_scripts[0]}"]
+
+    return ["sh", "-c"], [
+        " && ".join(
+            f"python {shlex.quote(f'{WORKSPACE}/{script}')}" for script in entry_scripts
+        )
+    ]
+
+
 class JobTemplatePluginSpec:
 
     @hookspec
@@ -37,6 +52,7 @@ class JobTemplatePluginSpec:
             str | None,
         ],
         target: Target,
+        entry_scripts: List[str],
     ) -> client.V1PodTemplateSpec:
         return None
 
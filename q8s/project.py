@@ -1,100 +1,217 @@
+import asyncio
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property
 from datetime import datetime
+from hashlib import blake2b
 from pathlib import Path
 from io import StringIO
-import selectors
-from subprocess import Popen, PIPE, STDOUT
+import json
+import os
+import shutil
 from os.path import join
 from typing import List, Optional
 from rich.progress import Progress
 import yaml
-from dacite import from_dict
-import sys
 
 from q8s.constants import BASE_IMAGES, WORKSPACE
 
+# Use the libyaml bindings when PyYAML was built with them
+try:
+    from yaml import CSafeDumper as YamlDumper, CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeDumper as YamlDumper, SafeLoader as YamlLoader
+
 
 def load(path: str):
     """
-    Load the project configuration from the Q8Sproject file
+    Load the project configuration from the Q8Sproject file, reusing the parsed
+    copy cached in .q8s_cache while the file is unchanged
     """
-    with open(join(path, "Q8Sproject"), "r") as f:
-        return yaml.safe_load(f)
+    projectpath = join(path, "Q8Sproject")
+    cachepath = join(path, ".q8s_cache", "Q8Sproject.json")
 
+    stat = os.stat(projectpath)
+    key = [stat.st_mtime_ns, stat.st_size]
 
-def rmdir(directory):
-    """
-    Recursively remove a directory and its contents
-    """
-    directory = Path(directory)
+    try:
+        with open(cachepath, "r") as f:
+            cached = json.load(f)
 
-    for item in directory.iterdir():
-        if item.is_dir():
-            rmdir(item)
-        else:
-            item.unlink()
+        if cached["key"] == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing or unreadable cache, fall back to parsing the file
+        pass
+
+    # Pass bytes so the YAML parser detects and decodes the encoding itself
+    with open(projectpath, "rb") as f:
+        data = yaml.load(f.read(), Loader=YamlLoader)
 
-    directory.rmdir()
+    # Only write the sidecar into a cache directory that init has already created
+    if os.path.isdir(join(path, ".q8s_cache")):
+        try:
+            with open(cachepath, "w") as f:
+                json.dump({"key": key, "data": data}, f)
+        except (OSError, TypeError, ValueError):
+            pass
 
+    return data
 
-def _read_stream_lines(stream, progress, silent, is_error: bool = False):
+
+# Size of the raw reads from subprocess pipes
+CHUNK_SIZE = 65536
+
+# Dockerfile instruction holding the image creation time
+CREATED_LABEL = b"LABEL org.opencontainers.image.created="
+
+
+async def _drain_stream(
+    stream: asyncio.StreamReader, progress, silent, prefix: str = ""
+):
     """
-    Helper to read from a stream line by line (testable without subprocess).
+    Print a subprocess stream in chunks until it is closed, one complete line at
+    a time, starting each line with the prefix.
     """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+
     while True:
-        line = stream.readline()
-        if line == '':
+        chunk = await stream.read(CHUNK_SIZE)
+        text = decoder.decode(chunk, final=not chunk)
+
+        # Hold back the incomplete last line until the rest of it arrives, the
+        # progress display would redraw over it
+        lines = (pending + text).split("\n")
+        pending = lines.pop() if chunk else ""
+        text = "".join(f"{prefix}{line}\n" for line in lines if chunk or line)
+
+        if text and not silent:
+            progress.console.print(text, end="", markup=False)
+
+        if not chunk:
             break
-        if not silent:
-            if is_error:
-                progress.console.print(f"[red]{line}[/red]", end="")
-            else:
-                progress.console.print(line, end="")
 
 
-def _handle_subprocess_output(process, progress, silent):
+async def _run(
+    cmd: List[str], progress, silent, env: dict = None, prefix: str = ""
+) -> int:
+    """
+    Run a command, draining stdout and stderr concurrently, and return its exit code.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+
+    _, _, returncode = await asyncio.gather(
+        _drain_stream(process.stdout, progress, silent, prefix),
+        _drain_stream(process.stderr, progress, silent, prefix),
+        process.wait(),
+    )
+
+    return returncode
+
+
+class InvalidProjectException(Exception):
+    pass
+
+
+def _require(data: dict, key: str, kind: type, section: str = ""):
     """
-    Read subprocess stdout and stderr line by line (Windows-safe).
+    Get a required entry of the Q8Sproject file, checking its type
     """
-    if process.stdout:
-        _read_stream_lines(process.stdout, progress, silent)
-        process.stdout.close()
+    name = f"{section}.{key}" if section else key
+
+    if key not in data or data[key] is None:
+        raise InvalidProjectException(f"Missing {name} in Q8Sproject")
 
-    if process.stderr:
-        _read_stream_lines(process.stderr, progress, silent, is_error=True)
-        process.stderr.close()
+    if not isinstance(data[key], kind):
+        raise InvalidProjectException(f"{name} in Q8Sproject must be a {kind.__name__}")
 
-    process.wait()
+    return data[key]
 
 
 @dataclass
 class Q8SPythonEnv:
     dependencies: List[str]
 
+    @classmethod
+    def from_dict(cls, data: dict, section: str = "python_env"):
+        dependencies = _require(data, "dependencies", object, section)
+
+        if not isinstance(dependencies, list) or not all(
+            isinstance(dependency, str) for dependency in dependencies
+        ):
+            raise InvalidProjectException(
+                f"{section}.dependencies in Q8Sproject must be a list of strings"
+            )
+
+        return cls(dependencies=dependencies)
+
 
 @dataclass
 class Q8STarget:
     python_env: Q8SPythonEnv
 
+    @classmethod
+    def from_dict(cls, data: dict, section: str):
+        return cls(
+            python_env=Q8SPythonEnv.from_dict(
+                _require(data, "python_env", dict, section), f"{section}.python_env"
+            )
+        )
+
 
-@dataclass
+@dataclass(frozen=True)
 class Q8STargets:
     cpu: Optional[Q8STarget]
     gpu: Optional[Q8STarget]
     qpu: Optional[Q8STarget]
 
+    @classmethod
+    def from_dict(cls, data: dict):
+        # Only a missing or null key leaves a target out
+        return cls(
+            **{
+                key: (
+                    Q8STarget.from_dict(
+                        _require(data, key, dict, "targets"), f"targets.{key}"
+                    )
+                    if data.get(key) is not None
+                    else None
+                )
+                for key in cls.__dataclass_fields__.keys()
+            }
+        )
+
+    def __post_init__(self):
+        # Frozen, so the targets cannot change after the keys are computed
+        object.__setattr__(
+            self,
+            "_active_keys",
+            tuple(
+                key
+                for key in self.__dataclass_fields__.keys()
+                if getattr(self, key) is not None
+            ),
+        )
+
     def keys(self):
-        return [
-            key
-            for key in self.__dataclass_fields__.keys()
-            if getattr(self, key) is not None
-        ]
+        return self._active_keys
 
 
 @dataclass
 class Q8SDocker:
     username: str
 
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(username=_require(data, "username", str, "docker"))
+
 
 @dataclass
 class Q8SProject:
@@ -104,6 +221,22 @@ class Q8SProject:
     docker: Q8SDocker
     kubeconfig: str
 
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Build the configuration from the parsed Q8Sproject file
+        """
+        if not isinstance(data, dict):
+            raise InvalidProjectException("Q8Sproject must be a mapping")
+
+        return cls(
+            name=_require(data, "name", str),
+            python_env=Q8SPythonEnv.from_dict(_require(data, "python_env", dict)),
+            targets=Q8STargets.from_dict(_require(data, "targets", dict)),
+            docker=Q8SDocker.from_dict(_require(data, "docker", dict)),
+            kubeconfig=_require(data, "kubeconfig", str),
+        )
+
 
 class CacheNotBuiltException(Exception):
     pass
@@ -117,11 +250,10 @@ class Project:
     name: str
     __path: str
     configuration: Q8SProject
-    __images: dict
 
     def __init__(self, path: str = Path.cwd()):
         try:
-            configuration = from_dict(data_class=Q8SProject, data=load(path=path))
+            configuration = Q8SProject.from_dict(load(path=path))
         except FileNotFoundError:
             raise ProjectNotFoundException(
                 "Q8Sproject file not found in current folder"
@@ -131,12 +263,17 @@ class Project:
         self.name = self.configuration.name
         self.__path = path
 
-        self.load_images_cache()
-
     @property
     def kubeconfig(self):
         return Path(self.configuration.kubeconfig)
 
+    @cached_property
+    def images(self) -> dict:
+        """
+        Built images by target, loaded from the cache on first access
+        """
+        return self.load_images_cache()
+
     def init_cache(self):
         """
         Initialize the cache directory
@@ -144,14 +281,25 @@ class Project:
         cachepath = join(self.__path, ".q8s_cache")
         Path(cachepath).mkdir(exist_ok=True)
 
+        # One timestamp for all the images initialized together
+        created = datetime.now().isoformat()
+
         for target in self.configuration.targets.keys():
             Path(join(self.__path, ".q8s_cache", target)).mkdir(exist_ok=True)
 
-            with open(join(cachepath, target, "requirements.txt"), "w") as f:
-                self.__create_requirements_txt(target, f)
+            requirements = StringIO()
+            self.__create_requirements_txt(target, requirements)
+
+            requirementspath = join(cachepath, target, "requirements.txt")
+            with open(requirementspath, "w") as f:
+                f.write(requirements.getvalue())
+
+            # Record the digest with the file's stat so check_cache can skip reading it
+            with open(requirementspath + ".digest", "w") as f:
+                f.write(self.__file_record(requirementspath, requirements.getvalue()))
 
             with open(join(cachepath, target, "Dockerfile"), "w") as f:
-                self.__create_dockerfile(target, f)
+                self.__create_dockerfile(target, f, created)
 
     def check_cache(self):
         result = True
@@ -161,98 +309,157 @@ class Project:
 
         return result
 
-    def load_images_cache(self):
+    def load_images_cache(self) -> dict:
         cachepath = join(self.__path, ".q8s_cache", "images")
 
-        if Path(cachepath).exists() is False:
-            self.__images = {}
-        else:
+        try:
             with open(cachepath, "r") as f:
-                self.__images = yaml.safe_load(f)
+                return yaml.load(f, Loader=YamlLoader) or {}
+        except FileNotFoundError:
+            return {}
 
     def cached_images(self, target: str) -> str:
         """
         Get the cached images
         """
-        cachepath = join(self.__path, ".q8s_cache", "images")
+        try:
+            return self.images[target]
+        except KeyError:
+            raise CacheNotBuiltException(
+                f"Image for target {target} not found, build the images first"
+            )
+
+    def build_digest(self, target: str, push: bool) -> str:
+        """
+        Digest of the inputs used to build (and push) the container image
+        """
+        digest = blake2b(f"{self.__image_name(target)} push={push}".encode())
 
-        if Path(cachepath).exists() is False:
+        try:
+            with open(join(self.__path, ".q8s_cache", target, "Dockerfile"), "rb") as f:
+                # The created label changes on every init without changing the image
+                for line in f:
+                    if not line.startswith(CREATED_LABEL):
+                        digest.update(line)
+
+            with open(
+                join(self.__path, ".q8s_cache", target, "requirements.txt"), "rb"
+            ) as f:
+                digest.update(f.read())
+        except FileNotFoundError:
             raise CacheNotBuiltException(
-                "Images cache not found, build the images first"
+                f"Build files for target {target} not found, initialize the project first"
             )
 
-        with open(cachepath, "r") as f:
-            return yaml.safe_load(f)[target]
+        return digest.hexdigest()
 
     def build_container(
-        self, target: str, progress: Progress, silent: bool, push: bool = True
+        self,
+        target: str,
+        progress: Progress,
+        silent: bool,
+        push: bool = True,
+        force: bool = False,
+        log_prefix: str = "",
     ):
         """
-        Build the container image
+        Build the container image, unless it was built from the same inputs
         """
         targetpath = join(self.__path, ".q8s_cache", target)
+        digestpath = join(self.__path, ".q8s_cache", "build_cache", f"{target}.hash")
+        digest = self.build_digest(target, push)
+
+        if not force and self.__read_digest(digestpath) == digest:
+            progress.console.print(f"Container {self.__image_name(target)} up to date")
+            self.images[target] = self.__image_name(target)
+            return
 
         task = progress.add_task(
             description=f"[cyan]Building container for {target}...", total=1
         )
 
-        # start the docker build command in subprocess and capture the output
-        build_process = Popen(
-            [
-                "docker",
-                "build",
-                "--progress",
-                "plain",
-                "--platform",
-                "linux/amd64",
-                "--tag",
-                self.__image_name(target),
-                targetpath,
-            ],
-            stdout=PIPE,
-            stderr=STDOUT,
-            bufsize=1,
-            universal_newlines=True,
-            encoding="utf-8",   # force UTF-8 decoding
-            errors="replace",   # avoid crashing on bad bytes
+        # buildx streams the layers to the registry while building, instead of a
+        # separate docker push afterwards
+        build_command = (
+            ["docker", "buildx", "build", "--push"] if push else ["docker", "build"]
         )
 
-        if sys.platform == "win32":
-            # Windows-safe: read line by line instead of using selectors
-            _handle_subprocess_output(build_process, progress, silent)
-        else:
-            def handle_output(stream, mask):
-                # Because the process' output is line buffered, there's only ever one
-                # line to read when this function is called
-                line = stream.readline()
-                if not silent:
-                    progress.console.print(line, end="")
-
-            # Register callback for an "available for read" event from subprocess' stdout stream
-            selector = selectors.DefaultSelector()
-            selector.register(build_process.stdout, selectors.EVENT_READ, handle_output)
-
-            # Loop until subprocess is terminated
-            while build_process.poll() is None:
-                # Wait for events and handle them with their registered callbacks
-                events = selector.select()
-                for key, mask in events:
-                    callback = key.data
-                    callback(key.fileobj, mask)
-
-            selector.close()
-
-        if build_process.returncode != 0:
+        # run the docker build command in subprocess and capture the output
+        returncode = asyncio.run(
+            _run(
+                [
+                    *build_command,
+                    "--progress",
+                    "plain",
+                    "--platform",
+                    "linux/amd64",
+                    # reuse layers of the previously pushed image and embed the
+                    # cache metadata in the new one
+                    "--cache-from",
+                    self.__image_name(target),
+                    "--build-arg",
+                    "BUILDKIT_INLINE_CACHE=1",
+                    "--tag",
+                    self.__image_name(target),
+                    targetpath,
+                ],
+                progress,
+                silent,
+                env=os.environ | {"DOCKER_BUILDKIT": "1"},
+                prefix=log_prefix,
+            )
+        )
+
+        if returncode != 0:
             progress.advance(task)
             raise Exception("Failed to build the container")
         else:
-            progress.console.print(f"Container {self.__image_name(target)} built")
+            progress.console.print(
+                f"Container {self.__image_name(target)} {'pushed' if push else 'built'}"
+            )
             progress.advance(task, 1)
 
-        if push:
-            self.push_container(target, progress, silent)
+        self.images[target] = self.__image_name(target)
+
+        Path(digestpath).parent.mkdir(exist_ok=True)
+        with open(digestpath, "w") as f:
+            f.write(digest)
 
-        self.__images[target] = self.__image_name(target)
+    def build_all(
+        self,
+        targets: List[str],
+        progress: Progress,
+        silent: bool,
+        push: bool = True,
+        force: bool = False,
+    ):
+        """
+        Build the container images of the targets concurrently
+        """
+        # Load the images cache before the workers share it
+        self.images
+
+        # Tell apart the lines of concurrent builds sharing the console
+        concurrent = len(targets) > 1
+
+        with ThreadPoolExecutor(max_workers=max(len(targets), 1)) as executor:
+            futures = [
+                executor.submit(
+                    self.build_container,
+                    target,
+                    progress,
+                    silent,
+                    push=push,
+                    force=force,
+                    log_prefix=f"{target} | " if concurrent else "",
+                )
+                for target in targets
+            ]
+
+        # Leaving the executor waits for every build, unlike map it does not cancel
+        # the pending ones when one fails
+        for future in futures:
+            future.result()
 
     def push_container(self, target: str, progress: Progress, silent: bool):
         """
@@ -262,43 +469,11 @@ class Project:
             description=f"[cyan]Pushing container for {target}...", total=1
         )
 
-        push_process = Popen(
-            ["docker", "push", self.__image_name(target)],
-            stdout=PIPE,
-            stderr=STDOUT,
-            bufsize=1,
-            universal_newlines=True,
-            encoding="utf-8",   # force UTF-8 decoding
-            errors="replace",   # avoid crashing on bad bytes
+        returncode = asyncio.run(
+            _run(["docker", "push", self.__image_name(target)], progress, silent)
         )
 
-        if sys.platform == "win32":
-            # Windows-safe: read line by line instead of using selectors
-            _handle_subprocess_output(push_process, progress, silent)
-
-        else:
-            def handle_output(stream, mask):
-                # Because the process' output is line buffered, there's only ever one
-                # line to read when this function is called
-                line = stream.readline()
-                if not silent:
-                    progress.console.print(line, end="")
-
-            # Register callback for an "available for read" event from subprocess' stdout stream
-            selector = selectors.DefaultSelector()
-            selector.register(push_process.stdout, selectors.EVENT_READ, handle_output)
-
-            # Loop until subprocess is terminated
-            while push_process.poll() is None:
-                # Wait for events and handle them with their registered callbacks
-                events = selector.select()
-                for key, mask in events:
-                    callback = key.data
-                    callback(key.fileobj, mask)
-
-            selector.close()
-
-        if push_process.returncode != 0:
+        if returncode != 0:
             progress.advance(task)
             raise Exception("Failed to push the container")
         else:
@@ -309,14 +484,21 @@ class Project:
         Update the images cache
         """
         with open(join(self.__path, ".q8s_cache", "images"), "w") as f:
-            yaml.dump(self.__images, f)
+            yaml.dump(self.images, f, Dumper=YamlDumper)
 
     def clear_cache(self):
         """
         Clear the cache directory
         """
         cachepath = join(self.__path, ".q8s_cache")
-        rmdir(cachepath)
+        shutil.rmtree(cachepath, ignore_errors=True)
+
+    def __read_digest(self, digestpath: str) -> Optional[str]:
+        try:
+            with open(digestpath, "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
 
     def __docker_login(self) -> str:
         return self.configuration.docker.username
@@ -324,15 +506,28 @@ class Project:
     def __image_name(self, target: str):
         return f"{self.__docker_login()}/q8s-{self.name.lower()}:{target}"
 
+    def __file_record(self, filepath: str, content: str) -> str:
+        stat = os.stat(filepath)
+        digest = blake2b(content.encode()).hexdigest()
+
+        return f"{digest} {stat.st_size} {stat.st_mtime_ns}"
+
     def __check_cache_file(self, target: str, file: str):
         cachepath = join(self.__path, ".q8s_cache", target, file)
-        if Path(cachepath).exists() is False:
-            print(f"Cache file {cachepath} does not exist")
-            return False
 
         file = StringIO()
         self.__create_requirements_txt(target, file)
 
+        try:
+            record = self.__file_record(cachepath, file.getvalue())
+        except FileNotFoundError:
+            print(f"Cache file {cachepath} does not exist")
+            return False
+
+        # Unchanged since it was generated from identical content
+        if self.__read_digest(cachepath + ".digest") == record:
+            return True
+
         with open(cachepath, "r") as f:
             if file.getvalue() != f.read():
                 print(f"Cache file {cachepath} is outdated")
@@ -341,45 +536,49 @@ class Project:
         return True
 
     def __create_requirements_txt(self, target: str, f):
-        print("# This file is autogenerated by q8sctl", file=f)
-        print("# Do not edit manually", file=f)
-
-        print("\n# Common dependencies:", file=f)
-
-        for dep in self.configuration.python_env.dependencies:
-            print(f"{dep}", file=f)
-
-        print("\n# Target specific dependencies:", file=f)
+        lines = [
+            "# This file is autogenerated by q8sctl",
+            "# Do not edit manually",
+            "",
+            "# Common dependencies:",
+            *self.configuration.python_env.dependencies,
+            "",
+            "# Target specific dependencies:",
+            *self.__get_target(target=target).python_env.dependencies,
+        ]
 
-        for dep in self.__get_target(target=target).python_env.dependencies:
-            print(f"{dep}", file=f)
+        f.write("\n".join(lines) + "\n")
 
-    def __create_dockerfile(self, target: str, f):
-        print("# This file is autogenerated by q8sctl", file=f)
-        print("# Do not edit manually\n", file=f)
+    def __create_dockerfile(self, target: str, f, created: str):
+        lines = [
+            "# This file is autogenerated by q8sctl",
+            "# Do not edit manually",
+            "",
+        ]
 
         if target == "gpu":
-            print(
-                "# Base image specifications are available at https://github.com/qubernetes-dev/images/tree/main/cuda",
-                file=f,
+            lines.append(
+                "# Base image specifications are available at https://github.com/qubernetes-dev/images/tree/main/cuda"
             )
 
-        print(f"FROM {BASE_IMAGES[target]}", file=f)
-        print("", file=f)
-
-        print(
-            f"LABEL org.opencontainers.image.created={datetime.now().isoformat()}",
-            file=f,
-        )
-        print(f"LABEL org.opencontainers.image.title={self.name}", file=f)
-        print("", file=f)
+        lines += [
+            f"FROM {BASE_IMAGES[target]}",
+            "",
+            f"WORKDIR {WORKSPACE}",
+            "COPY requirements.txt .",
+            "RUN pip install --no-cache -r requirements.txt",
+            "",
+            # Labels come last so a new timestamp does not invalidate the dependency layers
+            f"LABEL org.opencontainers.image.created={created}",
+            f"LABEL org.opencontainers.image.title={self.name}",
+        ]
 
-        print(f"WORKDIR {WORKSPACE}", file=f)
-        print("COPY requirements.txt .", file=f)
-        print("RUN pip install --no-cache -r requirements.txt", file=f)
+        f.write("\n".join(lines) + "\n")
 
     def __get_target(self, target: str) -> Q8STarget:
-        if hasattr(self.configuration.targets, target) is False:
+        target_configuration = getattr(self.configuration.targets, target, None)
+
+        if target_configuration is None:
             raise Exception(f"Target {target} not found")
 
-        return getattr(self.configuration.targets, target)
+        return target_configuration
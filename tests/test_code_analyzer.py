@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+
+from q8s.deps.code_analyzer import CodeAnalyzer
+
+
+class TestCodeAnalyzer(unittest.TestCase):
+    def test_excludes_stdlib_submodules(self):
+        code = "import os.path\nfrom concurrent.futures import ThreadPoolExecutor\nimport qiskit.circuit"
+
+        self.assertEqual(CodeAnalyzer(code).getImports(), ["qiskit"])
+
+    def test_finds_nested_imports(self):
+        code = """
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def run():
+    if numpy:
+        from qiskit_aer import AerSimulator
+"""
+
+        self.assertEqual(CodeAnalyzer(code).getImports(), ["numpy", "qiskit_aer"])
+
+    def test_finds_import_after_statement(self):
+        self.assertEqual(CodeAnalyzer("x = 1; import numpy").getImports(), ["numpy"])
+
+    @patch("q8s.deps.code_analyzer.ast.parse")
+    def test_skips_parsing_code_without_imports(self, mock_parse):
+        self.assertEqual(CodeAnalyzer("x = important(1)").getImports(), [])
+
+        mock_parse.assert_not_called()
+
+    def test_invalid_code_without_imports(self):
+        self.assertEqual(CodeAnalyzer("def (:").getImports(), [])
+
+        with self.assertRaises(SyntaxError):
+            CodeAnalyzer("import (:")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+import unittest
+from unittest.mock import MagicMock, patch
+
+from q8s.execution import K8sContext
+
+
+class TestK8sContext(unittest.TestCase):
+    @patch("q8s.execution.load_env", return_value={})
+    @patch("q8s.execution.client")
+    @patch("q8s.execution.config")
+    def setUp(self, mock_config, mock_client, mock_load_env):
+        mock_config.list_kube_config_contexts.return_value = (
+            None,
+            {"context": {"namespace": "default"}},
+        )
+
+        self.context = K8sContext("kubeconfig", progress=MagicMock())
+
+    def test_execute_uses_distinct_job_names(self):
+        names = []
+
+        def create_job_object(context, scripts):
+            names.append(context.name)
+
+        with (
+            patch.object(
+                K8sContext, "_K8sContext__create_job_object", create_job_object
+            ),
+            patch.object(
+                K8sContext,
+                "_K8sContext__complete_and_get_job_status",
+                return_value="stdout",
+            ),
+            patch.object(
+                K8sContext, "_K8sContext__get_pods_in_job", return_value="pod"
+            ),
+            patch.object(K8sContext, "_K8sContext__get_job_logs", return_value="logs"),
+            patch.object(K8sContext, "_K8sContext__delete_job"),
+        ):
+            self.assertEqual(self.context.execute("print(1)"), ("logs", "stdout"))
+            self.assertEqual(self.context.execute("print(2)"), ("logs", "stdout"))
+
+        self.assertEqual(len(names), 2)
+        self.assertNotEqual(names[0], names[1])
+
+    def test_fork_shares_clients(self):
+        fork = self.context.fork()
+
+        self.assertIsNot(fork, self.context)
+        self.assertIs(fork.core_api_instance, self.context.core_api_instance)
+        self.assertIs(fork.batch_api_instance, self.context.batch_api_instance)
+
+    def test_concurrent_forks_use_distinct_job_names(self):
+        names = set()
+        barrier = Barrier(2, timeout=5)
+
+        def create_job_object(context, scripts):
+            # Both jobs are submitted before either finishes
+            barrier.wait()
+            names.add(context.name)
+
+        with (
+            patch.object(
+                K8sContext, "_K8sContext__create_job_object", create_job_object
+            ),
+            patch.object(
+                K8sContext,
+                "_K8sContext__complete_and_get_job_status",
+                return_value="stdout",
+            ),
+            patch.object(
+                K8sContext, "_K8sContext__get_pods_in_job", return_value="pod"
+            ),
+            patch.object(K8sContext, "_K8sContext__get_job_logs", return_value="logs"),
+            patch.object(K8sContext, "_K8sContext__delete_job"),
+        ):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = [
+                    executor.submit(self.context.fork().execute, code)
+                    for code in ("print(1)", "print(2)")
+                ]
+
+        self.assertEqual(
+            [result.result() for result in results], [("logs", "stdout")] * 2
+        )
+        self.assertEqual(len(names), 2)
+
+    def test_create_job_waits_for_all_requests(self):
+        config_map_request = MagicMock()
+        config_map_request.get.side_effect = RuntimeError("config map")
+        secret_request = MagicMock()
+        registry_request = MagicMock()
+
+        core_api = self.context.core_api_instance
+        core_api.create_namespaced_config_map.return_value = config_map_request
+        core_api.create_namespaced_secret.side_effect = [
+            secret_request,
+            registry_request,
+        ]
+
+        self.context.set_container_image("vstirbu/q8s-example:cpu")
+        self.context.set_registry_pat("pat")
+
+        with self.assertRaisesRegex(RuntimeError, "config map"):
+            self.context._K8sContext__create_job_object({"main.py": "print(1)"})
+
+        secret_request.get.assert_called_once()
+        registry_request.get.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from kubernetes import client
-from q8s.plugins.job_template_spec import CPUJobTemplatePlugin, CUDAJobTemplatePlugin
+from q8s.plugins.cpu_job import CPUJobTemplatePlugin
+from q8s.plugins.cuda_job import CUDAJobTemplatePlugin
+from q8s.plugins.job_template_spec import entry_command
 from q8s.enums import Target
 
 
@@ -43,6 +45,7 @@ class TestCPUandGPUJobTemplatePlugin(unittest.TestCase):
             container_image,
             env,
             target,
+            ["main.py"],
         )
 
         self.assertIsNotNone(result)
@@ -90,6 +93,7 @@ class TestCPUandGPUJobTemplatePlugin(unittest.TestCase):
             container_image,
             env,
             target,
+            ["main.py"],
         )
 
         self.assertIsNotNone(result)
@@ -119,10 +123,23 @@ class TestCPUandGPUJobTemplatePlugin(unittest.TestCase):
             container_image,
             env,
             target,
+            ["main.py"],
         )
 
         self.assertIsNone(result)
 
+    def test_entry_command_single_script(self):
+        command, args = entry_command(["main.py"])
+
+        self.assertEqual(command, ["python"])
+        self.assertEqual(args, ["/app/main.py"])
+
+    def test_entry_command_clustered_scripts(self):
+        command, args = entry_command(["a.py", "b.py"])
+
+        self.assertEqual(command, ["sh", "-c"])
+        self.assertEqual(args, ["python /app/a.py && python /app/b.py"])
+
 
 if __name__ == "__main__":
     unittest.main()
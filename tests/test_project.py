@@ -1,10 +1,53 @@
+import asyncio
+from dataclasses import FrozenInstanceError
+import json
 from os import remove
 from os.path import exists, join
+from pathlib import Path
+from shutil import copy
+from tempfile import TemporaryDirectory
 import unittest
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from rich.console import Console
 from rich.progress import Progress, SpinnerColumn
 
-from q8s.project import Project
+from q8s.project import (
+    CacheNotBuiltException,
+    InvalidProjectException,
+    Project,
+    Q8SProject,
+    _drain_stream,
+    load,
+)
+
+FIXTURE = "tests/fixtures/cache"
+
+
+class FixtureTestCase(unittest.TestCase):
+    """
+    Runs each test on a copy of the fixture project
+    """
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = self.directory.name
+
+        copy(join(FIXTURE, "Q8Sproject"), self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class ProjectTestCase(FixtureTestCase):
+    """
+    Runs each test on an initialized copy of the fixture project
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.project = Project(self.path)
+        self.project.init_cache()
 
 
 class TestProject(unittest.TestCase):
@@ -20,7 +63,67 @@ class TestProject(unittest.TestCase):
 
         self.assertEqual(project.name, "Example")
         self.assertIsNotNone(project.configuration.python_env)
-        self.assertEqual(project.configuration.targets.keys(), {"cpu", "gpu"})
+        self.assertEqual(set(project.configuration.targets.keys()), {"cpu", "gpu"})
+
+    def test_configuration_from_dict(self):
+        configuration = Q8SProject.from_dict(
+            {
+                "name": "Example",
+                "python_env": {"dependencies": ["qiskit==1.1.0"]},
+                "targets": {
+                    "cpu": {"python_env": {"dependencies": ["qiskit-aer==0.15.1"]}}
+                },
+                "docker": {"username": "vstirbu"},
+                "kubeconfig": "kubeconfig.yaml",
+            }
+        )
+
+        self.assertEqual(configuration.name, "Example")
+        self.assertEqual(configuration.targets.keys(), ("cpu",))
+        self.assertIsNone(configuration.targets.gpu)
+        self.assertEqual(
+            configuration.targets.cpu.python_env.dependencies, ["qiskit-aer==0.15.1"]
+        )
+
+    def test_targets_are_immutable(self):
+        configuration = Q8SProject.from_dict(
+            {
+                "name": "Example",
+                "python_env": {"dependencies": []},
+                "targets": {"cpu": {"python_env": {"dependencies": []}}},
+                "docker": {"username": "vstirbu"},
+                "kubeconfig": "kubeconfig.yaml",
+            }
+        )
+
+        with self.assertRaises(FrozenInstanceError):
+            configuration.targets.cpu = None
+
+        self.assertEqual(configuration.targets.keys(), ("cpu",))
+
+    def test_configuration_rejects_string_dependencies(self):
+        with self.assertRaisesRegex(InvalidProjectException, "list of strings"):
+            Q8SProject.from_dict(
+                {
+                    "name": "Example",
+                    "python_env": {"dependencies": "qiskit==1.1.0"},
+                    "targets": {},
+                    "docker": {"username": "vstirbu"},
+                    "kubeconfig": "kubeconfig.yaml",
+                }
+            )
+
+    def test_configuration_rejects_empty_target(self):
+        with self.assertRaisesRegex(InvalidProjectException, "targets.cpu.python_env"):
+            Q8SProject.from_dict(
+                {
+                    "name": "Example",
+                    "python_env": {"dependencies": ["qiskit==1.1.0"]},
+                    "targets": {"cpu": {}, "gpu": None},
+                    "docker": {"username": "vstirbu"},
+                    "kubeconfig": "kubeconfig.yaml",
+                }
+            )
 
     def test_init_cache(self):
         project_path = "tests/fixtures/cache"
@@ -94,3 +197,236 @@ class TestProject(unittest.TestCase):
 
         assert mock_system.called
         assert mock_system.call_args[0][0] == f"docker push {image_name}"
+
+
+class TestLoad(FixtureTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.sidecar = Path(self.path, ".q8s_cache", "Q8Sproject.json")
+
+    def test_does_not_create_cache_directory(self):
+        self.assertEqual(load(self.path)["name"], "Example")
+        self.assertFalse(exists(join(self.path, ".q8s_cache")))
+
+    def test_reuses_parsed_configuration(self):
+        Path(self.path, ".q8s_cache").mkdir()
+        data = load(self.path)
+
+        self.assertTrue(self.sidecar.exists())
+
+        with patch("q8s.project.yaml.load") as mock_load:
+            self.assertEqual(load(self.path), data)
+
+        mock_load.assert_not_called()
+
+    def test_reparses_changed_file(self):
+        Path(self.path, ".q8s_cache").mkdir()
+        load(self.path)
+
+        project = Path(self.path, "Q8Sproject")
+        project.write_text(project.read_text().replace("Example", "Renamed project"))
+
+        self.assertEqual(load(self.path)["name"], "Renamed project")
+
+    def test_reparses_corrupt_cache(self):
+        Path(self.path, ".q8s_cache").mkdir()
+        self.sidecar.write_bytes(b"\x80not json")
+
+        self.assertEqual(load(self.path)["name"], "Example")
+        self.assertEqual(
+            json.loads(self.sidecar.read_text())["data"]["name"], "Example"
+        )
+
+
+class TestCachedImages(FixtureTestCase):
+    def test_missing_images_file(self):
+        project = Project(self.path)
+
+        with self.assertRaises(CacheNotBuiltException):
+            project.cached_images("cpu")
+
+    def test_missing_target(self):
+        Path(self.path, ".q8s_cache").mkdir()
+        Path(self.path, ".q8s_cache", "images").write_text(
+            "gpu: vstirbu/q8s-example:gpu\n"
+        )
+        project = Project(self.path)
+
+        self.assertEqual(project.cached_images("gpu"), "vstirbu/q8s-example:gpu")
+
+        with self.assertRaisesRegex(CacheNotBuiltException, "cpu"):
+            project.cached_images("cpu")
+
+
+@patch("q8s.project._run", new_callable=AsyncMock, return_value=0)
+class TestBuildCache(ProjectTestCase):
+
+    def build(self, **kwargs):
+        self.project.build_container(
+            target="cpu", progress=MagicMock(), silent=True, **kwargs
+        )
+
+    def test_skips_unchanged_build(self, mock_run: AsyncMock):
+        self.build()
+        self.build()
+
+        self.assertEqual(mock_run.await_count, 1)
+        self.assertEqual(self.project.images["cpu"], "vstirbu/q8s-example:cpu")
+
+    def test_skips_build_after_init(self, mock_run: AsyncMock):
+        self.build()
+        self.project.init_cache()
+        self.build()
+
+        self.assertEqual(mock_run.await_count, 1)
+
+    def test_changed_dockerfile_invalidates_build(self, mock_run: AsyncMock):
+        self.build()
+
+        with patch("q8s.project.WORKSPACE", "/workspace"):
+            self.project.init_cache()
+
+        self.build()
+
+        self.assertEqual(mock_run.await_count, 2)
+
+    def test_force_rebuilds(self, mock_run: AsyncMock):
+        self.build()
+        self.build(force=True)
+
+        self.assertEqual(mock_run.await_count, 2)
+
+    def test_push_flag_invalidates_build(self, mock_run: AsyncMock):
+        self.build(push=False)
+        self.build(push=True)
+        self.build(push=True)
+
+        self.assertEqual(mock_run.await_count, 2)
+        self.assertEqual(mock_run.await_args_list[0].args[0][:2], ["docker", "build"])
+        self.assertEqual(
+            mock_run.await_args_list[1].args[0][:4],
+            ["docker", "buildx", "build", "--push"],
+        )
+
+    def test_changed_requirements_invalidate_build(self, mock_run: AsyncMock):
+        self.build()
+        self.project.configuration.python_env.dependencies.append("numpy")
+        self.project.init_cache()
+        self.build()
+
+        self.assertEqual(mock_run.await_count, 2)
+
+    def test_failed_build_is_not_cached(self, mock_run: AsyncMock):
+        mock_run.return_value = 1
+
+        with self.assertRaises(Exception):
+            self.build()
+
+        mock_run.return_value = 0
+        self.build()
+
+        self.assertEqual(mock_run.await_count, 2)
+
+    def test_missing_build_files(self, mock_run: AsyncMock):
+        self.project.clear_cache()
+
+        with self.assertRaises(CacheNotBuiltException):
+            self.build()
+
+        mock_run.assert_not_awaited()
+
+
+class TestCheckCache(ProjectTestCase):
+
+    def test_edited_requirements_are_outdated(self):
+        with open(join(self.path, ".q8s_cache/cpu/requirements.txt"), "a") as f:
+            f.write("numpy\n")
+
+        self.assertFalse(self.project.check_cache())
+
+    def test_untouched_requirements_are_not_read(self):
+        with patch("builtins.open", side_effect=open) as mock_open:
+            self.assertTrue(self.project.check_cache())
+
+        opened = [call.args[0] for call in mock_open.call_args_list]
+
+        self.assertTrue(
+            any(path.endswith("requirements.txt.digest") for path in opened)
+        )
+        self.assertFalse(any(path.endswith("requirements.txt") for path in opened))
+
+    def test_missing_digest_falls_back_to_content(self):
+        remove(join(self.path, ".q8s_cache/cpu/requirements.txt.digest"))
+
+        self.assertTrue(self.project.check_cache())
+
+
+class TestBuildAll(ProjectTestCase):
+    def setUp(self):
+        super().setUp()
+
+        # The builds add their tasks to the progress from several threads
+        self.progress = Progress(console=Console(quiet=True))
+
+    def test_builds_all_targets(self):
+        with patch("q8s.project._run", new_callable=AsyncMock, return_value=0) as run:
+            self.project.build_all(
+                ("gpu", "cpu"), progress=self.progress, silent=False, push=False
+            )
+
+        prefixes = {call.kwargs["prefix"] for call in run.await_args_list}
+
+        self.assertEqual(prefixes, {"gpu | ", "cpu | "})
+        self.assertEqual(set(self.project.images), {"gpu", "cpu"})
+
+    def test_single_target_is_not_prefixed(self):
+        with patch("q8s.project._run", new_callable=AsyncMock, return_value=0) as run:
+            self.project.build_all(("cpu",), progress=self.progress, silent=False)
+
+        self.assertEqual(run.await_args.kwargs["prefix"], "")
+
+    def test_failure_is_raised_after_all_builds(self):
+        finished = []
+
+        async def run(cmd, progress, silent, env=None, prefix=""):
+            if cmd[-1].endswith("gpu"):
+                return 1
+
+            await asyncio.sleep(0.1)
+            finished.append(cmd[-1])
+            return 0
+
+        with patch("q8s.project._run", run):
+            with self.assertRaisesRegex(Exception, "Failed to build"):
+                self.project.build_all(
+                    ("gpu", "cpu"), progress=self.progress, silent=True
+                )
+
+        self.assertEqual(len(finished), 1)
+        self.assertEqual(set(self.project.images), {"cpu"})
+
+
+class TestDrainStream(unittest.TestCase):
+    def drain(self, chunks, prefix):
+        progress = MagicMock()
+        stream = MagicMock()
+        # One read per chunk, then the end of the stream
+        stream.read = AsyncMock(side_effect=[*chunks, b""])
+
+        asyncio.run(_drain_stream(stream, progress, False, prefix))
+
+        return [call.args[0] for call in progress.console.print.call_args_list]
+
+    def test_prefixes_lines_split_across_chunks(self):
+        output = self.drain([b"#1 load\n#2 bu", b"ild\n\n#3 done"], "cpu | ")
+
+        self.assertEqual(
+            output,
+            ["cpu | #1 load\n", "cpu | #2 build\ncpu | \n", "cpu | #3 done\n"],
+        )
+
+    def test_holds_back_split_line_without_prefix(self):
+        output = self.drain([b"#1 load\n#2 bu", b"ild\n#3 do", b"ne"], "")
+
+        self.assertEqual(output, ["#1 load\n", "#2 build\n", "#3 done\n"])